@@ -1,6 +1,6 @@
 import dataclasses
 import math
-from typing import Iterator, List, Optional, TypeVar
+from typing import Any, Callable, Iterator, List, Optional, TypeVar
 
 import torch
 
@@ -53,24 +53,36 @@ def to(data: T, *args, **kwargs) -> T:
             x = delu.to(x, torch.half)
     """
 
-    def TO_(x):
-        return to(x, *args, **kwargs)
+    return _map_tensors(lambda x: x.to(*args, **kwargs), data, strict=True)
+
+
+def _map_tensors(
+    fn: Callable[[torch.Tensor], torch.Tensor], data: T, *, strict: bool
+) -> T:
+    # Apply fn to all tensors in a (nested) collection. Other values are not allowed
+    # if strict is True, otherwise they are kept as is.
+    def MAP_(x):
+        return _map_tensors(fn, x, strict=strict)
 
     # mypy does not understand what is going on here, hence a lot of "type: ignore"
     if isinstance(data, torch.Tensor):
-        return data.to(*args, **kwargs)  # type: ignore
+        return fn(data)  # type: ignore
     elif isinstance(data, (tuple, list)):
-        constructor = type(data)._make if is_namedtuple(data) else type(data)  # type: ignore  # noqa: E501
-        return constructor(TO_(x) for x in data)  # type: ignore
+        cls: Any = type(data)
+        constructor = cls._make if is_namedtuple(data) else cls
+        return constructor(MAP_(x) for x in data)
     elif isinstance(data, dict):
-        return type(data)((k, TO_(v)) for k, v in data.items())  # type: ignore
-    elif dataclasses.is_dataclass(data):
-        return type(data)(**{k: TO_(v) for k, v in vars(data).items()})  # type: ignore
-    else:
+        return type(data)((k, MAP_(v)) for k, v in data.items())  # type: ignore
+    elif dataclasses.is_dataclass(data) and not isinstance(data, type):
+        fields = {k: MAP_(v) for k, v in vars(data).items()}
+        return type(data)(**fields)  # type: ignore
+    elif strict:
         raise ValueError(
             f'the input contains an object of the unsupported type {type(data)}.'
             ' See the documentation for details'
         )
+    else:
+        return data
 
 
 def cat(data: List[T], dim: int = 0) -> T:
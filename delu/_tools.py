@@ -251,6 +251,9 @@ class Timer:
         assert new_timer() == old_value
     """
 
+    # The clock can be replaced in tests.
+    _clock = staticmethod(time.perf_counter)
+
     # mypy cannot infer types from .reset(), so they must be given here
     _start_time: Optional[float]
     _pause_time: Optional[float]
@@ -283,9 +286,9 @@ class Timer:
         the previous pause time).
         """
         if self._start_time is None:
-            self._start_time = time.perf_counter()
+            self._start_time = self._clock()
         elif self._pause_time is not None:
-            self._shift -= time.perf_counter() - self._pause_time
+            self._shift -= self._clock() - self._pause_time
             self._pause_time = None
 
     def pause(self) -> None:
@@ -299,7 +302,7 @@ class Timer:
         """
         assert self._start_time is not None
         if self._pause_time is None:
-            self._pause_time = time.perf_counter()
+            self._pause_time = self._clock()
 
     def __call__(self) -> float:
         """Get the time elapsed since the start.
@@ -309,7 +312,7 @@ class Timer:
         """
         if self._start_time is None:
             return self._shift
-        now = self._pause_time or time.perf_counter()
+        now = self._pause_time or self._clock()
         return now - self._start_time + self._shift
 
     def __str__(self) -> str:
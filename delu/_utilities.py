@@ -1,7 +1,7 @@
 import inspect
-import secrets
+import os
 from contextlib import ContextDecorator
-from typing import Any, Optional
+from typing import Any, List, Literal, Optional, Tuple
 
 import torch
 import torch.nn as nn
@@ -9,33 +9,55 @@ import torch.nn as nn
 from . import random as delu_random
 from ._utils import deprecated
 
+# The lookup is done once instead of on every entry to `evaluation`.
+_INFERENCE_CTX = getattr(torch, 'inference_mode', torch.no_grad)
+
 
 @deprecated(
     'Instead, use `delu.random.seed` and manually set flags mentioned'
     ' in the `PyTorch docs on reproducibility <https://pytorch.org/docs/stable/notes/randomness.html>`_'  # noqa: E501
 )
 def improve_reproducibility(
-    base_seed: Optional[int], one_cuda_seed: bool = False
+    base_seed: Optional[int],
+    one_cuda_seed: bool = False,
+    *,
+    level: Literal['seed', 'cudnn', 'strict'] = 'cudnn',
 ) -> int:
     """Set seeds and turn off non-deterministic algorithms.
 
     Do everything possible to improve reproducibility for code that relies on global
     random number generators. See also the note below.
 
-    Sets:
+    Depending on ``level``, sets:
 
-    1. seeds in `random`, `numpy.random`, `torch`, `torch.cuda`
-    2. `torch.backends.cudnn.benchmark` to `False`
-    3. `torch.backends.cudnn.deterministic` to `True`
+    1. (all levels) seeds in `random`, `numpy.random`, `torch`, `torch.cuda`
+    2. (``'cudnn'`` and ``'strict'``) `torch.backends.cudnn.benchmark` to `False`
+    3. (``'cudnn'`` and ``'strict'``) `torch.backends.cudnn.deterministic` to `True`
+    4. (``'strict'``) ``torch.use_deterministic_algorithms(True, warn_only=True)``
+       and the environment variable ``CUBLAS_WORKSPACE_CONFIG`` to ``':4096:8'``
+       (unless it is already set)
 
     Args:
         base_seed: the argument for `delu.random.seed`. If `None`, a high-quality base
             seed is generated instead.
         one_cuda_seed: the argument for `delu.random.seed`.
+        level: the trade-off between reproducibility and performance. ``'seed'`` only
+            sets the seeds and keeps the cuDNN autotuner intact, which is the fastest
+            option (especially for fixed-shape convolutional workloads).
+            ``'cudnn'`` (the default) also disables the cuDNN autotuner and
+            non-deterministic cuDNN algorithms, which can make convolutions
+            several times slower. ``'strict'`` additionally makes PyTorch warn about
+            (and, when possible, replace) all non-deterministic operations; note that
+            ``CUBLAS_WORKSPACE_CONFIG`` has effect only if it is set before CUDA is
+            initialized. On ``torch<1.11``, where ``warn_only`` is not supported,
+            non-deterministic operations raise errors instead of warnings;
+            ``'strict'`` requires ``torch>=1.8``.
 
     Returns:
         base_seed: if ``base_seed`` is set to `None`, the generated base seed is
             returned; otherwise, ``base_seed`` is returned as is
+    Raises:
+        ValueError: if ``level`` is invalid
 
     Note:
         If you don't want to choose the base seed, but still want to have a chance to
@@ -53,12 +75,31 @@ def improve_reproducibility(
 
             assert delu.improve_reproducibility(0) == 0
             seed = delu.improve_reproducibility(None)
+            seed = delu.improve_reproducibility(None, level='seed')
     """
-    torch.backends.cudnn.benchmark = False  # type: ignore
-    torch.backends.cudnn.deterministic = True  # type: ignore
+    if level not in ('seed', 'cudnn', 'strict'):
+        raise ValueError(
+            'level must be one of "seed", "cudnn", "strict"'
+            f' (the provided value: "{level}").'
+        )
+    if level != 'seed':
+        torch.backends.cudnn.benchmark = False  # type: ignore
+        torch.backends.cudnn.deterministic = True  # type: ignore
+    if level == 'strict':
+        # See https://docs.nvidia.com/cuda/cublas/index.html#results-reproducibility
+        os.environ.setdefault('CUBLAS_WORKSPACE_CONFIG', ':4096:8')
+        try:
+            torch.use_deterministic_algorithms(True, warn_only=True)
+        except TypeError:
+            # torch<1.11 does not support warn_only
+            torch.use_deterministic_algorithms(True)
     if base_seed is None:
-        # See https://numpy.org/doc/1.18/reference/random/bit_generators/index.html#seeding-and-entropy  # noqa
-        base_seed = secrets.randbits(128) % (2**32 - 1024)
+        # The import is deferred, so that calls with explicit seeds do not pay for it.
+        import secrets
+
+        # Unlike reducing a bigger random number modulo (2**32 - 1024), this is
+        # unbiased, and the result is always less than 2**32 - 1024.
+        base_seed = secrets.randbits(31)
     else:
         assert base_seed < (2**32 - 1024)
     delu_random.seed(base_seed, one_cuda_seed)
@@ -89,10 +130,19 @@ class evaluation(ContextDecorator):
             ...
 
     Args:
-        modules
+        modules: at least one module
+        restore: if True, the training status of all submodules is restored once a
+            context is finished or a decorated function returns.
+    Raises:
+        TypeError: if no modules are provided
+    Note:
+        If ``restore`` is False, the training status of modules is undefined once a
+        context is finished or a decorated function returns.
     Note:
-        The training status of modules is undefined once a context is finished or a
-        decorated function returns.
+        The submodules are collected on every entry, so submodules added after the
+        construction are affected as well. If no submodule of a module overrides
+        `torch.nn.Module.train` and `torch.nn.Module.eval`, the ``training`` flag of
+        the submodules is set directly instead of calling ``eval()`` recursively.
     Warning:
         The function must be used in the same way as `torch.no_grad` and
         `torch.inference_mode`, i.e. only as a context manager or a decorator as shown
@@ -125,10 +175,15 @@ class evaluation(ContextDecorator):
                 ...
     """
 
-    def __init__(self, *modules: nn.Module) -> None:
-        assert modules
+    def __init__(self, *modules: nn.Module, restore: bool = False) -> None:
+        if not modules:
+            raise TypeError('At least one module must be provided.')
         self._modules = modules
-        self._torch_context: Any = None
+        self._restore = restore
+        # The same instance is entered repeatedly (and, possibly, recursively) when
+        # used as a decorator, hence the stacks.
+        self._training: List[List[Tuple[nn.Module, bool]]] = []
+        self._torch_contexts: List[Any] = []
 
     def __call__(self, func):
         """Decorate a function with an evaluation context.
@@ -144,14 +199,31 @@ class evaluation(ContextDecorator):
         return super().__call__(func)
 
     def __enter__(self) -> None:
-        assert self._torch_context is None
-        self._torch_context = getattr(torch, 'inference_mode', torch.no_grad)()
-        self._torch_context.__enter__()  # type: ignore
-        for m in self._modules:
-            m.eval()
+        # torch.inference_mode and torch.no_grad store their state in the instance, so
+        # a single instance cannot be shared by nested contexts and a new one is
+        # created for every entry.
+        torch_context = _INFERENCE_CTX()
+        torch_context.__enter__()
+        self._torch_contexts.append(torch_context)
+        # The module trees can change between entries, so they are traversed every
+        # time (which is still much cheaper than the recursive Module.eval).
+        submodules = [list(m.modules()) for m in self._modules]
+        if self._restore:
+            self._training.append([(x, x.training) for xs in submodules for x in xs])
+        for module, module_submodules in zip(self._modules, submodules):
+            # Modules with custom train/eval must be switched via their own eval.
+            if all(
+                type(x).train is nn.Module.train and type(x).eval is nn.Module.eval
+                for x in module_submodules
+            ):
+                for x in module_submodules:
+                    x.training = False
+            else:
+                module.eval()
 
     def __exit__(self, *exc):
-        assert self._torch_context is not None
-        result = self._torch_context.__exit__(*exc)  # type: ignore
-        self._torch_context = None
+        result = self._torch_contexts.pop().__exit__(*exc)
+        if self._restore:
+            for x, training in self._training.pop():
+                x.training = training
         return result
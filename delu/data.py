@@ -1,11 +1,32 @@
 """An addition to `torch.utils.data`."""
 
-from typing import Any, Callable, Iterable, Optional, Tuple, TypeVar, Union
-
+import contextlib
+import functools
+import os
+import queue
+import threading
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePath
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+import numpy as np
 import torch
-from torch.utils.data import DataLoader, Dataset
+from torch.utils.data import BatchSampler, DataLoader, Dataset, SequentialSampler
 
 from ._stream import Stream  # noqa: F401
+from ._tensor_ops import _map_tensors
 from ._utils import deprecated
 
 T = TypeVar('T')
@@ -35,9 +56,11 @@ class Enumerate(Dataset):
         """Initialize self.
 
         Args:
-            dataset
+            dataset: the dataset. Its size must not change after this call.
         """
         self._dataset = dataset
+        # The length is computed lazily, because datasets are not required to have it.
+        self._len: Optional[int] = None
 
     @property
     def dataset(self) -> Dataset:
@@ -50,7 +73,9 @@ class Enumerate(Dataset):
 
     def __len__(self) -> int:
         """Get the length of the underlying dataset."""
-        return len(self._dataset)  # type: ignore
+        if self._len is None:
+            self._len = len(self._dataset)  # type: ignore
+        return self._len
 
     def __getitem__(self, index) -> Tuple[Any, Any]:
         """Return index and the corresponding item from the underlying dataset.
@@ -62,6 +87,26 @@ class Enumerate(Dataset):
         """
         return index, self._dataset[index]
 
+    def __getitems__(self, indices: List[int]) -> List[Tuple[Any, Any]]:
+        """Return indices and the corresponding items from the underlying dataset.
+
+        This method is used by `torch.utils.data.DataLoader` to fetch the whole batch
+        at once. If the underlying dataset implements ``__getitems__``, then the
+        items are fetched with it.
+
+        Args:
+            indices
+        Returns:
+            [(index, item), ...]
+        """
+        getitems = getattr(self._dataset, '__getitems__', None)
+        items = (
+            getitems(indices)
+            if callable(getitems)
+            else [self._dataset[i] for i in indices]
+        )
+        return list(zip(indices, items))
+
 
 class IndexDataset(Dataset):
     """A trivial dataset that yeilds indices back to user (useful for DistributedDataParallel (DDP)).
@@ -72,8 +117,10 @@ class IndexDataset(Dataset):
     2. AND you work in the `Distributed Data Parallel <https://pytorch.org/tutorials/intermediate/ddp_tutorial.html>`_ setup
 
     Note:
-        If only the first condition is true, consider using the combinatation of
-        `torch.randperm` and `torch.Tensor.split` instead.
+        If only the first condition is true, consider using
+        `delu.data.iter_index_batches` instead. It produces batches of indices
+        directly via `torch.randperm` and `torch.Tensor.split` without the overhead
+        of `~torch.utils.data.DataLoader`.
 
     Example::
 
@@ -121,6 +168,272 @@ class IndexDataset(Dataset):
             )
         return i
 
+    def __getitems__(self, indices: List[int]) -> List[int]:
+        """Get the same indices back.
+
+        This method is used by `torch.utils.data.DataLoader` to fetch the whole batch
+        at once instead of calling `IndexDataset.__getitem__` for every index.
+        All indices must be integers from ``range(len(self))``.
+        """
+        if indices and (min(indices) < 0 or max(indices) >= self.size):
+            bad_index = next(i for i in indices if i < 0 or i >= self.size)
+            raise IndexError(
+                f"index {bad_index} is out of range (dataset's size is {self.size})"
+            )
+        return list(indices)
+
+
+def iter_index_batches(
+    size: int,
+    batch_size: int,
+    shuffle: bool = False,
+    *,
+    drop_last: bool = False,
+    device: Union[int, str, torch.device] = 'cpu',
+    generator: Optional[torch.Generator] = None,
+) -> Iterator[torch.Tensor]:
+    """Iterate over (random) batches of indices.
+
+    This is a fast replacement for ``DataLoader(IndexDataset(size), ...)`` (and for
+    `make_index_dataloader` and `IndexLoader`) in the case of ``num_workers=0``:
+    all indices are generated with one call to `torch.randperm` (or `torch.arange`)
+    directly on ``device`` and split into batches, so no dataset, sampler and collate
+    function are involved and no host-to-device copies are made.
+
+    Args:
+        size: the number of items (for example, ``len(dataset)``)
+        batch_size: the batch size. If ``drop_last`` is False, then the last batch can
+            be smaller than ``batch_size``.
+        shuffle: if True, iterate over random batches (without replacement),
+            not sequentially.
+        drop_last: same as the ``drop_last`` argument for `torch.utils.data.DataLoader`.
+        device: the device on which the indices are generated.
+        generator: the argument for `torch.randperm` when ``shuffle`` is True. Must be
+            located on ``device``.
+    Returns:
+        Iterator over batches of indices.
+    Raises:
+        ValueError: for invalid inputs
+
+    See also:
+        `delu.iter_batches`
+
+    Examples:
+        .. testcode::
+
+            for batch_idx in delu.data.iter_index_batches(10, 3):
+                print(batch_idx)
+
+        .. testoutput::
+
+            tensor([0, 1, 2])
+            tensor([3, 4, 5])
+            tensor([6, 7, 8])
+            tensor([9])
+
+        .. testcode::
+
+            for batch_idx in delu.data.iter_index_batches(10, 3, drop_last=True):
+                print(batch_idx)
+
+        .. testoutput::
+
+            tensor([0, 1, 2])
+            tensor([3, 4, 5])
+            tensor([6, 7, 8])
+
+        Usage for training:
+
+        .. code-block::
+
+            for epoch in range(n_epochs):
+                for batch_idx in delu.data.iter_index_batches(
+                    len(X), batch_size, shuffle=True, device=X.device
+                ):
+                    x_batch = X[batch_idx]
+                    y_batch = Y[batch_idx]
+                    ...
+    """
+    if size < 1:
+        raise ValueError('size must be positive')
+    if batch_size < 1:
+        raise ValueError('batch_size must be positive')
+    if not shuffle and generator is not None:
+        raise ValueError('When shuffle is False, generator must be None.')
+    batches = (
+        torch.randperm(size, generator=generator, device=device)
+        if shuffle
+        else torch.arange(size, device=device)
+    ).split(batch_size)
+    if drop_last and size % batch_size:
+        batches = batches[:-1]
+    return iter(batches)
+
+
+class _PrefetchError:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+_PREFETCH_END = object()
+
+
+def _pin_memory(x: torch.Tensor) -> torch.Tensor:
+    return x.pin_memory() if x.device.type == 'cpu' and not x.is_pinned() else x
+
+
+def _record_stream(x: torch.Tensor) -> torch.Tensor:
+    # The tensor was allocated on a side stream, so the caching allocator must know
+    # that it is used on the current stream as well.
+    if x.is_cuda:
+        x.record_stream(torch.cuda.current_stream(x.device))
+    return x
+
+
+class Prefetch:
+    """Prefetch items of an iterable in a background thread.
+
+    `Prefetch` wraps any iterable (e.g. `torch.utils.data.DataLoader`). While the
+    main thread processes the current item (e.g. runs forward and backward passes),
+    the next items are produced in a background thread and, optionally, moved to a
+    device. For CUDA devices, tensors are pinned and copied with
+    ``non_blocking=True`` on a dedicated CUDA stream, so host-to-device copies overlap
+    with computations on the current stream.
+
+    Items can be tensors or (nested) (named)tuples, lists, dictionaries and
+    dataclasses of tensors (as for `delu.to`); non-tensor values are kept as is.
+
+    Note:
+        Since the items are produced in a thread, the speedup comes from overlapping
+        the main thread's work with I/O, host-to-device copies and other code that
+        releases the GIL. For CPU-heavy data processing, use the ``num_workers``
+        argument of `torch.utils.data.DataLoader` (the two approaches can be combined).
+
+    Example::
+
+        loader = DataLoader(dataset, batch_size, shuffle=True, num_workers=4)
+        for epoch in range(n_epochs):
+            for batch in delu.data.Prefetch(loader, 'cuda'):
+                ...
+
+    .. testcode::
+
+        for x in delu.data.Prefetch(torch.arange(6).split(2)):
+            print(x)
+
+    .. testoutput::
+
+        tensor([0, 1])
+        tensor([2, 3])
+        tensor([4, 5])
+    """
+
+    def __init__(
+        self,
+        iterable: Iterable,
+        device: Optional[Union[int, str, torch.device]] = None,
+        *,
+        max_prefetch: int = 2,
+    ) -> None:
+        """Initialize self.
+
+        Args:
+            iterable: the iterable to prefetch items from. It is iterated in a
+                background thread.
+            device: if presented, the items are moved to this device.
+            max_prefetch: the maximum number of items produced in advance.
+        Raises:
+            ValueError: if ``max_prefetch`` is not positive
+        """
+        if max_prefetch < 1:
+            raise ValueError(
+                'max_prefetch must be a positive number'
+                f' (the provided value: {max_prefetch}).'
+            )
+        if isinstance(device, (int, str)):
+            device = torch.device(device)
+        self._iterable = iterable
+        self._device = device
+        self._max_prefetch = max_prefetch
+
+    def __len__(self) -> int:
+        """Get the size of the underlying iterable."""
+        return len(self._iterable)  # type: ignore
+
+    def __iter__(self) -> Iterator:
+        device = self._device
+        if device is not None and device.type == 'cuda' and device.index is None:
+            # The current CUDA device is thread-local, so it must be resolved in the
+            # caller's thread (a new thread always starts on the default device).
+            device = torch.device('cuda', torch.cuda.current_device())
+        buffer: queue.Queue = queue.Queue(self._max_prefetch)
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self._produce, args=(buffer, stop, device), daemon=True
+        )
+        thread.start()
+        try:
+            while True:
+                item = buffer.get()
+                if item is _PREFETCH_END:
+                    return
+                if isinstance(item, _PrefetchError):
+                    raise item.error
+                data, event = item
+                if event is not None:
+                    # The copies were made on the side stream of the target device
+                    # (not necessarily the current one), so that device's current
+                    # stream must wait for them.
+                    event.wait(torch.cuda.current_stream(device))
+                    data = _map_tensors(_record_stream, data, strict=False)
+                yield data
+        finally:
+            # If the loop is interrupted, the thread stops after producing the
+            # current item.
+            stop.set()
+
+    def _produce(
+        self,
+        buffer: queue.Queue,
+        stop: threading.Event,
+        device: Optional[torch.device],
+    ) -> None:
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        is_cuda = device is not None and device.type == 'cuda'
+        try:
+            # All CUDA work of this thread (the stream, the copies, the events) is
+            # done on the target device.
+            with torch.cuda.device(device) if is_cuda else contextlib.nullcontext():
+                stream = torch.cuda.Stream() if is_cuda else None
+                for data in self._iterable:
+                    event = None
+                    if stream is not None:
+                        data = _map_tensors(_pin_memory, data, strict=False)
+                        with torch.cuda.stream(stream):
+                            data = _map_tensors(
+                                lambda x: x.to(device, non_blocking=True),
+                                data,
+                                strict=False,
+                            )
+                            event = torch.cuda.Event()
+                            event.record(stream)
+                    elif device is not None:
+                        data = _map_tensors(lambda x: x.to(device), data, strict=False)
+                    if not put((data, event)):
+                        return
+        except BaseException as err:
+            put(_PrefetchError(err))
+        else:
+            put(_PREFETCH_END)
+
 
 @deprecated('')
 class FnDataset(Dataset):
@@ -176,6 +489,11 @@ class FnDataset(Dataset):
         from functools import lru_cache
         dataset = delu.data.FnDataset(lru_cache(None)(Image.open), filenames)
 
+    A list of transformed images, where the *transformed* images are cached (up to
+    1000 of them)::
+
+        dataset = delu.data.FnDataset(Image.open, filenames, transform, cache=1000)
+
     `pathlib.Path` is handy for creating datasets that read from files::
 
         images_dir = Path(...)
@@ -225,17 +543,32 @@ class FnDataset(Dataset):
         fn: Callable[..., T],
         args: Union[int, Iterable],
         transform: Optional[Callable[[T], Any]] = None,
+        *,
+        cache: Optional[int] = None,
+        num_threads: Optional[int] = None,
     ) -> None:
         """Initialize self.
 
         Args:
             fn: the function that produces values based on arguments from ``args``
-            args: arguments for ``fn``. If an iterable, but not a list, then is
-                casted to a list. If an integer, then the behavior is the same as for
-                ``list(range(args))``. The size of ``args`` defines the return
-                value for `FnDataset.__len__`.
+            args: arguments for ``fn``. If an iterable, but not a tuple or a range,
+                then is casted to a tuple (ranges are stored as is). If an integer,
+                then the behavior is the same as for ``range(args)``. The size of
+                ``args`` defines the return value for `FnDataset.__len__`.
             transform: if presented, is applied to the return value of `fn` in
                 `FnDataset.__getitem__`
+            cache: if presented, the final values (i.e. after ``transform``) are
+                cached by index with `functools.lru_cache` of this size.
+                Note that DataLoader workers do not share caches, so this is useful
+                only for ``num_workers=0`` or ``persistent_workers=True``. The cache
+                is not pickled.
+            num_threads: if presented, `FnDataset.__getitems__` (which is used by
+                `torch.utils.data.DataLoader` to fetch batches) computes the values
+                in a thread pool of this size. This is useful when ``fn`` is I/O-bound
+                or releases the GIL (e.g. image decoding). ``fn`` and ``transform``
+                must be thread-safe.
+        Raises:
+            ValueError: if ``num_threads`` is not positive
 
         Examples:
             .. code-block::
@@ -245,12 +578,58 @@ class FnDataset(Dataset):
 
                 dataset = delu.data.FnDataset(Image.open, filenames, T.ToTensor())
         """
+        if num_threads is not None and num_threads < 1:
+            raise ValueError(
+                'num_threads must be a positive number'
+                f' (the provided value: {num_threads}).'
+            )
         self._fn = fn
         if isinstance(args, Iterable):
-            if not isinstance(args, list):
-                args = list(args)
+            if not isinstance(args, (tuple, range, _PathArray)):
+                args = tuple(args)
         self._args = args
+        self._len = args if isinstance(args, int) else len(args)
         self._transform = transform
+        self._cache = cache
+        self._num_threads = num_threads
+        self._init_derived()
+
+    def _init_derived(self) -> None:
+        # The pool is created lazily and is not shared with forked processes
+        # (threads do not survive fork), hence the process id.
+        self._pool: Optional[Tuple[ThreadPoolExecutor, int]] = None
+        # The branching is resolved once here, so that __getitem__ does not have to
+        # check the type of args and the presence of transform for every item.
+        args = self._args
+        self._get_arg = self._check_index if isinstance(args, int) else args.__getitem__
+        pipeline = self._apply if self._transform is None else self._apply_transform
+        self._pipeline = (
+            pipeline
+            if self._cache is None
+            else functools.lru_cache(self._cache)(pipeline)
+        )
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The dataset is pickled for every DataLoader worker (unless workers are
+        # forked), so the derived attributes (including the lru_cache wrapper, which
+        # cannot be pickled, and the pool) are rebuilt in __setstate__ instead of
+        # being pickled, and paths are pickled in a compact form.
+        state = self.__dict__.copy()
+        for key in ['_pool', '_get_arg', '_pipeline']:
+            del state[key]
+        args = state['_args']
+        if (
+            isinstance(args, tuple)
+            and args
+            and isinstance(args[0], PurePath)
+            and all(type(x) is type(args[0]) for x in args)
+        ):
+            state['_args'] = _PathArray(args)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._init_derived()
 
     def __len__(self) -> int:
         """Get the dataset size.
@@ -260,7 +639,7 @@ class FnDataset(Dataset):
         Returns:
             size
         """
-        return len(self._args) if isinstance(self._args, list) else self._args
+        return self._len
 
     def __getitem__(self, index: int) -> Any:
         """Get value by index.
@@ -274,17 +653,72 @@ class FnDataset(Dataset):
         Raises:
             IndexError: if ``index >= len(self)``
         """
-        if isinstance(self._args, list):
-            x = self._args[index]
-        elif index < self._args:
-            x = index
-        else:
+        return self._pipeline(index)
+
+    def __getitems__(self, indices: List[int]) -> List[Any]:
+        """Get values by indices.
+
+        This method is used by `torch.utils.data.DataLoader` to fetch the whole batch
+        at once. If ``num_threads`` was passed to the constructor, the values are
+        computed in a thread pool.
+
+        Args:
+            indices
+        Returns:
+            values
+        Raises:
+            IndexError: if ``index >= len(self)`` for any index
+        """
+        if self._num_threads is None:
+            return [self._pipeline(i) for i in indices]
+        pid = os.getpid()
+        if self._pool is None or self._pool[1] != pid:
+            self._pool = (ThreadPoolExecutor(self._num_threads), pid)
+        return list(self._pool[0].map(self._pipeline, indices))
+
+    def _check_index(self, index: int) -> int:
+        if index < self._args:  # type: ignore
+            return index
+        raise IndexError(f'Index {index} is out of range')
+
+    def _apply(self, index: int) -> Any:
+        return self._fn(self._get_arg(index))
+
+    def _apply_transform(self, index: int) -> Any:
+        return self._transform(self._fn(self._get_arg(index)))  # type: ignore
+
+
+class _PathArray(Sequence):
+    # A read-only sequence of paths of the same type stored as one string with
+    # offsets. Compared to a tuple of paths, it is pickled and unpickled much faster,
+    # since paths are created only on access.
+
+    def __init__(self, paths: Tuple[PurePath, ...]) -> None:
+        strings = [str(x) for x in paths]
+        self._type = type(paths[0])
+        self._data = ''.join(strings)
+        self._offsets = np.zeros(len(strings) + 1, np.int64)
+        np.cumsum(
+            np.fromiter(map(len, strings), np.int64, len(strings)),
+            out=self._offsets[1:],
+        )
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        size = len(self)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
             raise IndexError(f'Index {index} is out of range')
-        x = self._fn(x)
-        return x if self._transform is None else self._transform(x)
+        return self._type(self._data[self._offsets[index] : self._offsets[index + 1]])
 
 
-@deprecated('Instead, use `delu.data.IndexDataset` and `~torch.utils.data.DataLoader`')
+@deprecated(
+    'Instead, use `delu.data.iter_index_batches`'
+    ' or `delu.data.IndexDataset` and `~torch.utils.data.DataLoader`'
+)
 def make_index_dataloader(size: int, *args, **kwargs) -> DataLoader:
     """Make `~torch.utils.data.DataLoader` over indices instead of data.
 
@@ -343,18 +777,25 @@ def make_index_dataloader(size: int, *args, **kwargs) -> DataLoader:
             tensor([3, 4, 5])
             tensor([6, 7, 8])
     See also:
-        `delu.iter_batches`
+        - `delu.data.iter_index_batches`
+        - `delu.iter_batches`
     """
     return DataLoader(IndexDataset(size), *args, **kwargs)
 
 
-@deprecated('Instead, use `delu.data.IndexDataset` and `~torch.utils.data.DataLoader`')
+@deprecated(
+    'Instead, use `delu.data.iter_index_batches`'
+    ' or `delu.data.IndexDataset` and `~torch.utils.data.DataLoader`'
+)
 class IndexLoader:
     """Like `~torch.utils.data.DataLoader`, but over indices instead of data.
 
     **The shuffling logic is delegated to the native PyTorch DataLoader**, i.e. no
     custom logic is performed under the hood. The data loader which actually generates
-    indices is available as `IndexLoader.loader`.
+    indices is available as `IndexLoader.loader`. In the simplest case (sequential
+    order, no workers, no custom collate function, sampler or memory pinning),
+    the loader is bypassed and the batches are produced directly by
+    `delu.data.iter_index_batches` (on ``device``), which yields the same batches.
 
     Examples:
 
@@ -397,7 +838,8 @@ class IndexLoader:
             tensor([6, 7, 8])
 
     See also:
-        `delu.iter_batches`
+        - `delu.data.iter_index_batches`
+        - `delu.iter_batches`
     """
 
     def __init__(
@@ -408,21 +850,33 @@ class IndexLoader:
         Args:
             size: the number of items (for example, :code:`len(dataset)`)
             *args: positional arguments for `torch.utils.data.DataLoader`
-            device: if not CPU, then all indices are materialized and moved to the
-                device at the beginning of every loop. It can be useful when the indices
-                are applied to non-CPU data (e.g. CUDA-tensors) and moving data between
-                devices takes non-negligible time (which can happen in the case of
-                simple and fast models like MLPs).
+            device: if not CPU, then every batch of indices is moved to the device
+                as soon as it is produced (for CUDA, via pinned memory and
+                non-blocking copies). It can be useful when the indices are applied
+                to non-CPU data (e.g. CUDA-tensors).
             **kwargs: keyword arguments for `torch.utils.data.DataLoader`
         Raises:
             AssertionError: if size is not positive
         """
         assert size > 0
-        self._batch_size = args[0] if args else kwargs.get('batch_size', 1)
+        self._size = size
         self._loader = DataLoader(IndexDataset(size), *args, **kwargs)
         if isinstance(device, (int, str)):
             device = torch.device(device)
         self._device = device
+        loader = self._loader
+        # The fast path is only taken for the samplers created by DataLoader itself
+        # (custom samplers can cover only a part of the dataset).
+        self._direct = (
+            loader.num_workers == 0
+            and loader.batch_size is not None
+            and type(loader.sampler) is SequentialSampler
+            and loader.sampler.data_source is loader.dataset
+            and type(loader.batch_sampler) is BatchSampler
+            and loader.batch_sampler.sampler is loader.sampler
+            and loader.collate_fn is torch.utils.data.dataloader.default_collate
+            and not loader.pin_memory
+        )
 
     @property
     def loader(self) -> DataLoader:
@@ -434,12 +888,27 @@ class IndexLoader:
         return len(self.loader)
 
     def __iter__(self):
-        return iter(
-            self._loader
-            if self._device.type == 'cpu'
-            else torch.cat(list(self.loader)).to(self._device).split(self._batch_size)
+        if self._direct:
+            # DataLoader draws its base seed when an iterator is created, so the same
+            # draw is made here to keep the state of the random number generator.
+            torch.empty((), dtype=torch.int64).random_(generator=self._loader.generator)
+            return iter_index_batches(
+                self._size,
+                self._loader.batch_size,  # type: ignore
+                drop_last=self._loader.drop_last,
+                device=self._device,
+            )
+        return (
+            iter(self._loader) if self._device.type == 'cpu' else self._iter_on_device()
         )
 
+    def _iter_on_device(self) -> Iterator[torch.Tensor]:
+        pin_memory = self._device.type == 'cuda'
+        for batch in self._loader:
+            if pin_memory:
+                batch = batch.pin_memory()
+            yield batch.to(self._device, non_blocking=pin_memory)
+
 
 @deprecated('Instead, use `torch.utils.data.default_collate`')
 def collate(iterable: Iterable) -> Any:
@@ -447,8 +916,28 @@ def collate(iterable: Iterable) -> Any:
     Namely, the input is allowed to be any kind of iterable, not only a list. Firstly,
     if it is not a list, it is transformed to a list. Then, the list is passed to the
     original function and the result is returned as is.
+
+    For lists of tensors and lists of NumPy arrays (of the same shape and dtype), the
+    items are stacked directly without going through the type dispatch of the original
+    function. This is not done in `torch.utils.data.DataLoader` workers, where the
+    original function allocates the batch directly in shared memory.
     """
     if not isinstance(iterable, list):
         iterable = list(iterable)
+    if iterable and torch.utils.data.get_worker_info() is None:
+        first = iterable[0]
+        if isinstance(first, torch.Tensor):
+            return torch.stack(iterable, 0)
+        elif (
+            isinstance(first, np.ndarray)
+            and first.dtype.kind not in 'OSUV'
+            and all(
+                isinstance(x, np.ndarray)
+                and x.shape == first.shape
+                and x.dtype == first.dtype
+                for x in iterable
+            )
+        ):
+            return torch.from_numpy(np.stack(iterable, 0))
     # > Module has no attribute "default_collate"
     return torch.utils.data.dataloader.default_collate(iterable)  # type: ignore
@@ -1,4 +1,6 @@
 import dataclasses
+import functools
+from collections import deque
 from collections.abc import Mapping, Sequence
 from types import SimpleNamespace
 
@@ -10,35 +12,100 @@ import delu
 from .util import Point, PointDC
 
 
-def flatten(data):
+@functools.lru_cache(maxsize=None)
+def _dataclass_field_names(cls):
+    # None for non-dataclasses
+    return (
+        tuple(x.name for x in dataclasses.fields(cls))
+        if dataclasses.is_dataclass(cls)
+        else None
+    )
+
+
+def _get_children(data):
+    # Return the children of a node or None for leaves.
     if isinstance(data, torch.Tensor):
-        yield data
+        return None
     elif isinstance(data, (str, bytes)):
-        # mypy: NaN
-        yield data  # type: ignore
+        return None
     elif isinstance(data, Sequence):
-        for x in data:
-            yield from flatten(x)
+        return data
     elif isinstance(data, Mapping):
-        for x in data.values():
-            yield from flatten(x)
+        return data.values()
     elif isinstance(data, SimpleNamespace):
-        for x in vars(data).values():
-            yield from flatten(x)
-    elif dataclasses.is_dataclass(data):
-        for x in vars(data).values():
-            yield from flatten(x)
-    else:
-        yield data
+        return vars(data).values()
+    names = _dataclass_field_names(type(data))
+    return None if names is None else [getattr(data, x) for x in names]
+
+
+# The exact-type lookup covers the common containers, _get_children is the fallback
+# (e.g. for namedtuples, dataclasses and Tensor subclasses).
+_GET_CHILDREN = {
+    str: lambda x: None,
+    bytes: lambda x: None,
+    tuple: lambda x: x,
+    list: lambda x: x,
+    dict: lambda x: x.values(),
+    SimpleNamespace: lambda x: vars(x).values(),
+}
+
 
+def flatten(data):
+    # Depth-first traversal without recursion; the children are pushed in reverse order
+    # so that the leaves are yielded from left to right.
+    stack = deque([data])
+    while stack:
+        x = stack.pop()
+        tp = type(x)
+        if tp is torch.Tensor:
+            # Most nodes are plain tensors (leaves).
+            yield x
+            continue
+        children = _GET_CHILDREN.get(tp, _get_children)(x)
+        if children is None:
+            yield x
+        else:
+            stack.extend(reversed(list(children)))
+
+
+# delu.to never modifies its input, so the same tensors can be reused. However, the
+# leaves of inputs checked with `is` must be distinct objects, otherwise swapped or
+# duplicated leaves would go unnoticed, hence the clones.
+_ZEROS = {
+    torch.float32: torch.tensor(0, dtype=torch.float32),
+    torch.int64: torch.tensor(0, dtype=torch.int64),
+}
+_PAIR_F32 = (_ZEROS[torch.float32].clone(), _ZEROS[torch.float32].clone())
+
+
+def t(dtype):
+    return _ZEROS[dtype]
+
+
+@dataclasses.dataclass
+class A:
+    a: torch.Tensor
+
+
+@pytest.fixture(scope='module')
+def nested_tensor_tree():
+    def t32():
+        return t(torch.float32).clone()
+
+    return {
+        'a': [t32(), (t32(), t32())],
+        'b': {'c': {'d': [[[t32()]]]}},
+        'c': Point(t32(), {'d': t32()}),
+        'f': A(a=t32()),
+    }
 
-def test_to():
+
+def test_to(nested_tensor_tree):
     with pytest.raises(ValueError):
         delu.to(None)
     with pytest.raises(ValueError):
         delu.to([None, None])
 
-    t = lambda x: torch.tensor(0, dtype=x)  # noqa
     f32 = torch.float32
     i64 = torch.int64
 
@@ -47,32 +114,12 @@ def test_to():
         assert delu.to(x, dtype) is x
     assert delu.to(t(f32), i64).dtype is i64
 
-    for Container in tuple, Point, list:
-        constructor = Container._make if Container is Point else Container
-        for dtype in [f32, i64]:
-            x = constructor([t(f32), t(f32)])
-            out = delu.to(x, dtype)
-            assert isinstance(out, Container)
-            assert all(x.dtype is dtype for x in out)
-            if dtype is f32:
-                for x, y in zip(out, x):
-                    assert x is y
-
-    data = [t(f32), t(f32)]
+    data = list(_PAIR_F32)
     for x, y in zip(delu.to(data, f32), data):
         assert x is y
     assert all(x.dtype is i64 for x in delu.to(data, i64))
 
-    @dataclasses.dataclass
-    class A:
-        a: torch.Tensor
-
-    data = {
-        'a': [t(f32), (t(f32), t(f32))],
-        'b': {'c': {'d': [[[t(f32)]]]}},
-        'c': Point(t(f32), {'d': t(f32)}),
-        'f': A(a=t(f32)),
-    }
+    data = nested_tensor_tree
     for x, y in zip(flatten(delu.to(data, f32)), flatten(data)):
         assert x is y
     for x, y in zip(flatten(delu.to(data, i64)), flatten(data)):
@@ -80,6 +127,18 @@ def test_to():
         assert type(x) is type(y)
 
 
+@pytest.mark.parametrize('Container', [tuple, Point, list])
+@pytest.mark.parametrize('dtype', [torch.float32, torch.int64])
+def test_to_container(Container, dtype):
+    x = Container._make(_PAIR_F32) if Container is Point else Container(_PAIR_F32)
+    out = delu.to(x, dtype)
+    assert isinstance(out, Container)
+    assert all(x.dtype is dtype for x in out)
+    if dtype is torch.float32:
+        for x, y in zip(out, x):
+            assert x is y
+
+
 def test_cat():
     # The function is mostly tested in the doctests.
     with pytest.raises(ValueError):
@@ -59,25 +59,52 @@ def test_early_stopping():
         assert es.should_stop()
 
 
-def test_timer():
+@pytest.fixture
+def fake_sleep(monkeypatch):
+    # Replace the timer's clock with a fake one: every reading of the clock advances
+    # the time by 0.001 seconds (so the time never stands still, as with a real clock),
+    # and the returned function advances the time by the given number of seconds.
+    now = [0.0]
+
+    def clock():
+        now[0] += 0.001
+        return now[0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    monkeypatch.setattr(delu.Timer, '_clock', staticmethod(clock))
+    return sleep
+
+
+@pytest.fixture
+def fresh_timer(fake_sleep):
+    timer = delu.Timer()
+    timer.run()
+    return timer
+
+
+def test_timer(fake_sleep):
     with pytest.raises(AssertionError):
         delu.Timer().pause()
 
     # initial state, run
     timer = delu.Timer()
-    sleep(0.001)
     assert not timer()
     timer.run()
     assert timer()
 
-    # pause
+
+def test_timer_pause(fresh_timer):
+    timer = fresh_timer
     timer.pause()
     timer.pause()  # two pauses in a row
     x = timer()
-    sleep(0.001)
     assert timer() == x
 
-    # run
+
+def test_timer_run(fresh_timer):
+    timer = fresh_timer
     timer.pause()
     x = timer()
     timer.run()
@@ -85,52 +112,57 @@ def test_timer():
     assert timer() != x
     timer.pause()
     x = timer()
-    sleep(0.001)
     assert timer() == x
-    timer.run()
 
-    # reset
+
+def test_timer_reset(fresh_timer):
+    timer = fresh_timer
     timer.reset()
     assert not timer()
+    timer.run()  # a reset timer can be run again
+    assert timer()
 
 
 def test_timer_measurements():
+    # Sleeps never undershoot, but they can overshoot by several milliseconds on
+    # loaded machines (the scheduler's wake-up granularity), so the absolute
+    # tolerance is much larger than the sleep duration and the lower bound is exact.
     x = perf_counter()
-    sleep(0.1)
+    sleep(0.005)
     correct = perf_counter() - x
     timer = delu.Timer()
     timer.run()
-    sleep(0.1)
+    sleep(0.005)
     actual = timer()
-    # the allowed deviation was obtained from manual runs on my laptop so the test may
-    # behave differently on other hardware
+    assert actual >= 0.005
     assert actual == pytest.approx(correct, abs=0.01)
 
 
-def test_timer_context():
+def test_timer_context(fake_sleep):
     with delu.Timer() as timer:
-        sleep(0.01)
+        fake_sleep(0.01)
     assert timer() > 0.01
     assert timer() == timer()
 
     timer = delu.Timer()
     timer.run()
-    sleep(0.01)
+    fake_sleep(0.01)
     timer.pause()
     with timer:
-        sleep(0.01)
+        fake_sleep(0.01)
     assert timer() > 0.02
     assert timer() == timer()
 
 
-def test_timer_pickle():
+def test_timer_pickle(fake_sleep):
     timer = delu.Timer()
     timer.run()
-    sleep(0.01)
+    fake_sleep(0.01)
     timer.pause()
     value = timer()
-    sleep(0.01)
-    assert pickle.loads(pickle.dumps(timer))() == timer() == value
+    dump = pickle.dumps(timer, protocol=pickle.HIGHEST_PROTOCOL)
+    assert pickle.dumps(timer, protocol=pickle.HIGHEST_PROTOCOL) == dump
+    assert pickle.loads(dump)() == timer() == value
 
 
 def test_timer_format():
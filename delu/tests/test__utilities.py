@@ -1,6 +1,6 @@
+import os
 import random
 
-import numpy as np
 import pytest
 import torch
 
@@ -9,38 +9,103 @@ import delu
 from .util import ignore_deprecated_warning
 
 
+@pytest.fixture(scope='module')
+def linear_pool():
+    # The models are shared by all test_evaluation cases, which set the training
+    # status explicitly.
+    return {n: [torch.nn.Linear(1, 1) for _ in range(n)] for n in range(3)}
+
+
 @ignore_deprecated_warning
 @pytest.mark.parametrize('train', [False, True])
 @pytest.mark.parametrize('grad', [False, True])
 @pytest.mark.parametrize('n_models', range(3))
-def test_evaluation(train, grad, n_models):
+def test_evaluation(train, grad, n_models, linear_pool):
     if not n_models:
-        with pytest.raises(AssertionError):
+        with pytest.raises(TypeError):
             with delu.evaluation():
                 pass
         return
 
-    torch.set_grad_enabled(grad)
-    models = [torch.nn.Linear(1, 1) for _ in range(n_models)]
-    for x in models:
-        x.train(train)
-    with delu.evaluation(*models):
-        assert all(not x.training for x in models[:-1])
+    # The context manager restores the global grad mode even if the test fails.
+    with torch.set_grad_enabled(grad):
+        models = linear_pool[n_models]
+        for x in models:
+            x.train(train)
+        with delu.evaluation(*models):
+            assert all(not x.training for x in models[:-1])
+            assert not torch.is_grad_enabled()
+        assert torch.is_grad_enabled() == grad
+        for x in models:
+            x.train(train)
+
+        @delu.evaluation(*models)
+        def f():
+            assert all(not x.training for x in models[:-1])
+            assert not torch.is_grad_enabled()
+            for x in models:
+                x.train(train)
+
+        for _ in range(3):
+            f()
+            assert torch.is_grad_enabled() == grad
+
+
+@ignore_deprecated_warning
+def test_evaluation_submodules():
+    class FrozenBatchNorm(torch.nn.BatchNorm1d):
+        def train(self, mode=True):
+            super().train(mode)
+            self.calls = getattr(self, 'calls', 0) + 1
+            return self
+
+    plain = torch.nn.Sequential(torch.nn.Linear(1, 1), torch.nn.Dropout())
+    custom = torch.nn.Sequential(torch.nn.Linear(1, 1), FrozenBatchNorm(1))
+    with delu.evaluation(plain, custom):
+        assert not any(x.training for x in plain.modules())
+        assert not any(x.training for x in custom.modules())
+        assert custom[1].calls == 1
+
+    plain.train()
+    custom[0].eval()
+    training = [x.training for m in (plain, custom) for x in m.modules()]
+    with delu.evaluation(plain, custom, restore=True):
+        assert not any(x.training for m in (plain, custom) for x in m.modules())
+    assert [x.training for m in (plain, custom) for x in m.modules()] == training
+
+    # Submodules replaced after the construction are also switched.
+    @delu.evaluation(plain)
+    def f():
+        return [x.training for x in plain.modules()]
+
+    plain[1] = torch.nn.Dropout()
+    plain.train()
+    assert f() == [False, False, False]
+
+
+@ignore_deprecated_warning
+def test_evaluation_nested():
+    grad = torch.is_grad_enabled()
+    model = torch.nn.Linear(1, 1)
+    with delu.evaluation(model):
+        with delu.evaluation(model):
+            pass
         assert not torch.is_grad_enabled()
     assert torch.is_grad_enabled() == grad
-    for x in models:
-        x.train(train)
 
-    @delu.evaluation(*models)
-    def f():
-        assert all(not x.training for x in models[:-1])
+    @delu.evaluation(model, restore=True)
+    def f(n):
         assert not torch.is_grad_enabled()
-        for x in models:
-            x.train(train)
+        if n:
+            model.train()
+            f(n - 1)
+            assert model.training
+            model.eval()
 
-    for _ in range(3):
-        f()
-        assert torch.is_grad_enabled() == grad
+    model.train()
+    f(3)
+    assert model.training
+    assert torch.is_grad_enabled() == grad
 
 
 @ignore_deprecated_warning
@@ -52,20 +117,69 @@ def test_evaluation_generator():
             yield 1
 
 
+_UPPER_BOUND = 100
+
+
 @ignore_deprecated_warning
-def test_improve_reproducibility():
+@pytest.mark.parametrize('seed', [None, 0, 2])
+def test_improve_reproducibility(seed):
+    # Imported here, because this is the only test that needs NumPy.
+    import numpy as np
+
+    out = torch.empty(1, dtype=torch.int64)
+
     def f():
-        upper_bound = 100
         return [
-            random.randint(0, upper_bound),
-            np.random.randint(upper_bound),
-            torch.randint(upper_bound, (1,))[0].item(),
+            random.randint(0, _UPPER_BOUND),
+            np.random.randint(_UPPER_BOUND),
+            torch.randint(_UPPER_BOUND, (1,), out=out).item(),
         ]
 
-    for seed in [None, 0, 1, 2]:
-        seed = delu.improve_reproducibility(seed)
-        assert not torch.backends.cudnn.benchmark
-        assert torch.backends.cudnn.deterministic
-        results = f()
-        delu.random.seed(seed)
-        assert results == f()
+    seed = delu.improve_reproducibility(seed)
+    results = f()
+    delu.random.seed(seed)
+    assert results == f()
+
+
+@ignore_deprecated_warning
+@pytest.mark.parametrize('level', ['seed', 'cudnn', 'strict'])
+def test_improve_reproducibility_level(level, monkeypatch):
+    monkeypatch.delenv('CUBLAS_WORKSPACE_CONFIG', raising=False)
+    monkeypatch.setattr(torch.backends.cudnn, 'benchmark', True)
+    monkeypatch.setattr(torch.backends.cudnn, 'deterministic', False)
+    deterministic_algorithms = torch.are_deterministic_algorithms_enabled()
+    warn_only = torch.is_deterministic_algorithms_warn_only_enabled()
+    try:
+        assert delu.improve_reproducibility(0, level=level) == 0
+        assert torch.backends.cudnn.benchmark == (level == 'seed')
+        assert torch.backends.cudnn.deterministic == (level != 'seed')
+        assert torch.are_deterministic_algorithms_enabled() == (level == 'strict')
+        assert ('CUBLAS_WORKSPACE_CONFIG' in os.environ) == (level == 'strict')
+    finally:
+        torch.use_deterministic_algorithms(
+            deterministic_algorithms, warn_only=warn_only
+        )
+
+
+@ignore_deprecated_warning
+def test_improve_reproducibility_strict_old_torch(monkeypatch):
+    calls = []
+
+    def use_deterministic_algorithms(mode):
+        # The signature for torch<1.11 (no warn_only).
+        calls.append(mode)
+
+    monkeypatch.delenv('CUBLAS_WORKSPACE_CONFIG', raising=False)
+    monkeypatch.setattr(torch.backends.cudnn, 'benchmark', True)
+    monkeypatch.setattr(torch.backends.cudnn, 'deterministic', False)
+    monkeypatch.setattr(
+        torch, 'use_deterministic_algorithms', use_deterministic_algorithms
+    )
+    assert delu.improve_reproducibility(0, level='strict') == 0
+    assert calls == [True]
+
+
+@ignore_deprecated_warning
+def test_improve_reproducibility_bad_level():
+    with pytest.raises(ValueError):
+        delu.improve_reproducibility(0, level='hello')  # type: ignore
@@ -1,10 +1,15 @@
+import copy
+import pickle
+from pathlib import Path, PurePosixPath
+
+import numpy as np
 import pytest
 import torch
-from torch.utils.data import DataLoader, TensorDataset
+from torch.utils.data import BatchSampler, DataLoader, SequentialSampler, TensorDataset
 
 import delu.data
 
-from .util import ignore_deprecated_warning
+from .util import ignore_deprecated_warning, requires_gpu
 
 
 def test_enumerate():
@@ -13,6 +18,90 @@ def test_enumerate():
     assert x.dataset is dataset
     assert len(x) == 10
     assert x[3] == (3, (torch.tensor(3), torch.tensor(3)))
+    assert x.__getitems__([3, 1]) == [
+        (3, (torch.tensor(3), torch.tensor(3))),
+        (1, (torch.tensor(1), torch.tensor(1))),
+    ]
+
+    x = delu.data.Enumerate(delu.data.IndexDataset(10))
+    assert x.__getitems__([3, 1]) == [(3, 3), (1, 1)]
+    for batch_idx, batch in DataLoader(x, 3):
+        assert torch.equal(batch_idx, batch)
+
+    # Map-style datasets are not required to implement __len__.
+    class Squares(torch.utils.data.Dataset):
+        def __getitem__(self, index):
+            return index * index
+
+    x = delu.data.Enumerate(Squares())
+    assert x[3] == (3, 9)
+    with pytest.raises(TypeError):
+        len(x)
+
+
+def test_prefetch():
+    with pytest.raises(ValueError):
+        delu.data.Prefetch([], max_prefetch=0)
+
+    data = torch.arange(10)
+    for max_prefetch in [1, 2, 20]:
+        prefetch = delu.data.Prefetch(data.split(3), max_prefetch=max_prefetch)
+        assert len(prefetch) == 4
+        for _ in range(2):
+            batches = list(prefetch)
+            assert len(batches) == 4
+            assert torch.equal(torch.cat(batches), data)
+
+    items = [{'a': torch.tensor(0), 'b': [torch.tensor(1.0), 'text']}]
+    batch = next(iter(delu.data.Prefetch(items, 'cpu')))
+    assert batch['a'] is items[0]['a']
+    assert batch['b'][1] == 'text'
+
+    # early exit
+    for batch in delu.data.Prefetch(iter(range(1000)), max_prefetch=1):
+        break
+
+    def generator():
+        yield 0
+        raise RuntimeError('test')
+
+    prefetch = iter(delu.data.Prefetch(generator()))
+    assert next(prefetch) == 0
+    with pytest.raises(RuntimeError, match='test'):
+        next(prefetch)
+
+
+@requires_gpu
+def test_prefetch_cuda():
+    data = [(torch.tensor([i]), {'x': torch.tensor([i + 0.5])}) for i in range(10)]
+    batches = list(delu.data.Prefetch(data, 'cuda'))
+    assert len(batches) == len(data)
+    for (x, y), (x_, y_) in zip(batches, data):
+        assert x.is_cuda and y['x'].is_cuda
+        assert torch.equal(x.cpu(), x_) and torch.equal(y['x'].cpu(), y_['x'])
+
+
+@pytest.mark.skipif(
+    torch.cuda.device_count() < 2, reason="Two GPUs are required for this test"
+)
+def test_prefetch_cuda_non_current_device():
+    data = [torch.full((1000,), i) for i in range(10)]
+    with torch.cuda.device(0):
+        for x, x_ in zip(delu.data.Prefetch(data, 'cuda:1'), data):
+            assert x.device == torch.device('cuda:1')
+            assert torch.equal((x + 1).cpu(), x_ + 1)
+
+
+@pytest.mark.skipif(
+    torch.cuda.device_count() < 2, reason="Two GPUs are required for this test"
+)
+def test_prefetch_cuda_current_device():
+    # A device without index means the current device of the caller's thread.
+    data = [torch.full((1000,), i) for i in range(10)]
+    with torch.cuda.device(1):
+        for x, x_ in zip(delu.data.Prefetch(data, 'cuda'), data):
+            assert x.device == torch.device('cuda:1')
+            assert torch.equal((x + 1).cpu(), x_ + 1)
 
 
 def test_fndataset():
@@ -22,6 +111,9 @@ def test_fndataset():
     assert dataset[1] == 2
     assert dataset[2] == 4
 
+    with pytest.raises(IndexError):
+        dataset[3]
+
     dataset = delu.data.FnDataset(lambda x: x * 2, 3, lambda x: x * 3)
     assert len(dataset) == 3
     assert dataset[0] == 0
@@ -34,11 +126,110 @@ def test_fndataset():
     assert dataset[1] == 20
     assert dataset[2] == 200
 
-    dataset = delu.data.FnDataset(lambda x: x * 2, (x for x in range(0, 10, 4)))
-    assert len(dataset) == 3
-    assert dataset[0] == 0
-    assert dataset[1] == 8
-    assert dataset[2] == 16
+    for args in [(x for x in range(0, 10, 4)), range(0, 10, 4)]:
+        dataset = delu.data.FnDataset(lambda x: x * 2, args)
+        assert len(dataset) == 3
+        assert dataset[0] == 0
+        assert dataset[1] == 8
+        assert dataset[2] == 16
+        with pytest.raises(IndexError):
+            dataset[3]
+
+
+def test_fndataset_cache():
+    calls = []
+
+    def f(x):
+        calls.append(x)
+        return x * 2
+
+    dataset = delu.data.FnDataset(f, 3, lambda x: x * 3, cache=2)
+    assert [dataset[0], dataset[0], dataset[1], dataset[0]] == [0, 0, 6, 0]
+    assert calls == [0, 1]
+    dataset[2]
+    dataset[1]  # 1 is the least recently used item, so it was evicted
+    assert calls == [0, 1, 2, 1]
+
+    dataset = pickle.loads(pickle.dumps(delu.data.FnDataset(abs, [-1, -2], cache=2)))
+    assert [dataset[0], dataset[1]] == [1, 2]
+
+
+def test_fndataset_getitems():
+    with pytest.raises(ValueError):
+        delu.data.FnDataset(abs, 3, num_threads=0)
+
+    for num_threads in [None, 1, 4]:
+        dataset = delu.data.FnDataset(
+            lambda x: x * 2, 10, lambda x: x + 1, num_threads=num_threads
+        )
+        assert dataset.__getitems__([3, 0, 9]) == [7, 1, 19]
+        with pytest.raises(IndexError):
+            dataset.__getitems__([0, 10])
+        assert torch.equal(
+            torch.cat(list(DataLoader(dataset, 3))), torch.arange(10) * 2 + 1
+        )
+
+    dataset = pickle.loads(
+        pickle.dumps(delu.data.FnDataset(abs, [-1, -2, -3], num_threads=2))
+    )
+    assert dataset.__getitems__([2, 0]) == [3, 1]
+
+
+# Module-level, so that they can be pickled.
+class _TaggedEnumerate(delu.data.Enumerate):
+    def __init__(self, dataset, tag):
+        super().__init__(dataset)
+        self.tag = tag
+
+
+class _TaggedFnDataset(delu.data.FnDataset):
+    def __init__(self, fn, args, tag, **kwargs):
+        super().__init__(fn, args, **kwargs)
+        self.tag = tag
+
+
+def test_fndataset_pickle():
+    paths = [Path('a'), Path('b/c.png'), Path('d/é')]
+    for args in [
+        3,
+        range(3),
+        paths,
+        ['a', 'b', 'c'],
+        [Path('a'), PurePosixPath('b'), Path('c')],
+    ]:
+        dataset = delu.data.FnDataset(str, args, str.upper, cache=2)
+        dataset[0]
+        new_dataset = pickle.loads(pickle.dumps(dataset))
+        assert len(new_dataset) == len(dataset)
+        assert [new_dataset[i] for i in range(3)] == [dataset[i] for i in range(3)]
+        assert new_dataset[-1] == dataset[-1]
+        with pytest.raises(IndexError):
+            new_dataset[3]
+
+    dataset = pickle.loads(pickle.dumps(delu.data.FnDataset(copy.copy, paths)))
+    assert [dataset[i] for i in range(3)] == paths
+    assert all(type(dataset[i]) is type(paths[i]) for i in range(3))
+    dataset = pickle.loads(pickle.dumps(dataset))
+    assert [dataset[i] for i in range(3)] == paths
+
+    x = pickle.loads(pickle.dumps(delu.data.Enumerate(delu.data.IndexDataset(3))))
+    assert len(x) == 3
+    assert x[2] == (2, 2)
+
+    # Subclasses and their attributes are preserved.
+    paths = [Path('a'), Path('b')]
+    for dataset in [
+        _TaggedEnumerate(delu.data.IndexDataset(3), 'x'),
+        _TaggedFnDataset(str, paths, 'x', cache=2, num_threads=2),
+    ]:
+        for new_dataset in [
+            pickle.loads(pickle.dumps(dataset)),
+            copy.copy(dataset),
+            copy.deepcopy(dataset),
+        ]:
+            assert type(new_dataset) is type(dataset)
+            assert new_dataset.tag == 'x'
+            assert new_dataset.__getitems__([1, 0]) == dataset.__getitems__([1, 0])
 
 
 def test_index_dataset():
@@ -52,12 +243,83 @@ def test_index_dataset():
     with pytest.raises(IndexError):
         d[n]
 
+    assert d.__getitems__([3, 0, 9]) == [3, 0, 9]
+    with pytest.raises(IndexError):
+        d.__getitems__([0, -1])
+    with pytest.raises(IndexError):
+        d.__getitems__([n, 0])
+    for x, y in zip(DataLoader(d, 3), torch.arange(n).split(3)):
+        assert torch.equal(x, y)
+
+
+def test_iter_index_batches():
+    with pytest.raises(ValueError):
+        delu.data.iter_index_batches(0, 1)
+    with pytest.raises(ValueError):
+        delu.data.iter_index_batches(1, 0)
+
+    n = 10
+    for batch_size in range(1, n + 2):
+        for drop_last in [False, True]:
+            correct = list(DataLoader(torch.arange(n), batch_size, drop_last=drop_last))
+            actual = list(
+                delu.data.iter_index_batches(n, batch_size, drop_last=drop_last)
+            )
+            assert len(actual) == len(correct)
+            for x, y in zip(actual, correct):
+                assert torch.equal(x, y)
+
+            batches = list(
+                delu.data.iter_index_batches(
+                    n, batch_size, shuffle=True, drop_last=drop_last
+                )
+            )
+            assert [len(x) for x in batches] == [len(x) for x in correct]
+            if not drop_last:
+                assert sorted(torch.cat(batches).tolist()) == list(range(n))
+
+
+def test_iter_index_batches_generator():
+    with pytest.raises(ValueError):
+        delu.data.iter_index_batches(10, 3, generator=torch.Generator())
+
+    gen = torch.Generator()
+    state = gen.get_state()
+    batches0 = list(delu.data.iter_index_batches(10, 3, True, generator=gen))
+    gen.set_state(state)
+    batches1 = list(delu.data.iter_index_batches(10, 3, True, generator=gen))
+    for x in zip(batches0, batches1):
+        assert torch.equal(*x)
+
+
+def _collate_is_shared(items):
+    # Module-level, so that it can be sent to DataLoader workers.
+    return delu.data.collate(items).is_shared()
+
 
 @ignore_deprecated_warning
 def test_collate():
     # just test that the function is still a valid alias
     assert torch.equal(delu.data.collate([1])[0], torch.tensor(1))
 
+    tensors = [torch.tensor([0, 1]), torch.tensor([2, 3])]
+    correct = torch.tensor([[0, 1], [2, 3]])
+    assert torch.equal(delu.data.collate(tensors), correct)
+    assert torch.equal(delu.data.collate(iter(tensors)), correct)
+    assert torch.equal(delu.data.collate([x.numpy() for x in tensors]), correct)
+    with pytest.raises(TypeError):
+        delu.data.collate([np.array(['a']), np.array(['b'])])
+    with pytest.raises(RuntimeError):
+        delu.data.collate([np.zeros(1), np.zeros(2)])
+    assert torch.equal(
+        delu.data.collate([np.zeros(2, np.float32), np.ones(2, np.float64)]),
+        torch.tensor([[0.0, 0.0], [1.0, 1.0]], dtype=torch.float64),
+    )
+
+    # In workers, batches are allocated in shared memory as with default_collate.
+    loader = DataLoader(tensors, 2, num_workers=1, collate_fn=_collate_is_shared)
+    assert list(loader) == [True]
+
 
 @ignore_deprecated_warning
 def test_iloader():
@@ -77,3 +339,46 @@ def test_iloader():
         )
         for x, y in zip(actual, correct):
             assert torch.equal(x, y)
+
+    for batch_size in range(1, len(data) + 2):
+        for drop_last in [False, True]:
+            correct = list(DataLoader(data, batch_size, drop_last=drop_last))
+            loader = delu.data.IndexLoader(len(data), batch_size, drop_last=drop_last)
+            assert loader._direct
+            actual = list(loader)
+            assert len(actual) == len(correct) == len(loader)
+            for x, y in zip(actual, correct):
+                assert torch.equal(x, y)
+    assert not delu.data.IndexLoader(len(data), 2, shuffle=True)._direct
+    assert not delu.data.IndexLoader(len(data), 2, num_workers=1)._direct
+
+    # Custom samplers are respected.
+    batch_sampler = BatchSampler(SequentialSampler(range(5)), 2, False)
+    loader = delu.data.IndexLoader(len(data), batch_sampler=batch_sampler)
+    assert not loader._direct
+    assert [x.tolist() for x in loader] == [[0, 1], [2, 3], [4]]
+    loader = delu.data.IndexLoader(len(data), 2, sampler=SequentialSampler(range(5)))
+    assert not loader._direct
+    assert len(loader) == 3
+    assert [x.tolist() for x in loader] == [[0, 1], [2, 3], [4]]
+
+    # The fast path consumes the global random number generator as DataLoader does.
+    states = []
+    for loader in [DataLoader(data, 3), delu.data.IndexLoader(len(data), 3)]:
+        torch.manual_seed(0)
+        for _ in loader:
+            pass
+        states.append(torch.get_rng_state())
+    assert torch.equal(*states)
+
+
+@requires_gpu
+@ignore_deprecated_warning
+def test_iloader_device():
+    for batch_size in range(1, 11):
+        correct = list(DataLoader(torch.arange(10), batch_size))
+        actual = list(delu.data.IndexLoader(10, batch_size, device='cuda'))
+        assert len(actual) == len(correct)
+        for x, y in zip(actual, correct):
+            assert x.device.type == 'cuda'
+            assert torch.equal(x.cpu(), y)